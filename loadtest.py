@@ -0,0 +1,488 @@
+# loadtest.py
+"""
+Prueba de carga de FASTRACK sin tocar Google Sheets.
+
+Simula N operadores concurrentes recorriendo las cinco páginas de consulta
+con `streamlit.testing.v1.AppTest`, contra un reemplazo local de `gspread`
+que sirve datos sintéticos de PROCESO/DETALLE con latencia configurable y
+errores 429 por cuota. Al final reporta latencia p50/p95 por acción, RSS
+máximo del proceso y llamadas a la API de Sheets por acción.
+
+Todas las sesiones corren en hilos de un mismo proceso y comparten un único
+runtime (y por lo tanto el caché de `st.cache_data`), igual que en el
+contenedor real. Para lograrlo replica y parchea internos de AppTest
+verificados con streamlit 1.66 (`STREAMLIT_VERIFICADO`); con otra versión
+avisa, y si esos internos ya no existen termina con un mensaje claro.
+
+Uso:
+    python loadtest.py --usuarios 10 --iteraciones 3 --latencia 0.3
+"""
+import argparse
+import inspect
+import logging
+import math
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import streamlit as st
+from google.oauth2 import service_account
+from streamlit.testing.v1 import AppTest
+
+# Versión de streamlit contra la que se verificaron los internos de AppTest
+# que esta prueba replica o parchea (ver shared_runtime y main)
+STREAMLIT_VERIFICADO = "1.66"
+
+try:
+    import streamlit.testing.v1.app_test as app_test
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import (
+        MemoryCacheStorageManager,
+    )
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1.util import patch_config_options
+except ImportError as e:
+    sys.exit(
+        f"loadtest.py depende de internos de streamlit {STREAMLIT_VERIFICADO} que no "
+        f"existen en la versión instalada ({st.__version__}): {e}"
+    )
+
+_INTERNOS = [
+    (Runtime, "instance"),
+    (Runtime, "exists"),
+    (ScriptCache, "get_bytecode"),
+    (app_test, "patch_config_options"),
+    (AppTest(__file__, default_timeout=1), "_bidi_component_manager"),
+    (Secrets(), "_secrets"),
+]
+
+
+def _existe(obj, attr: str) -> bool:
+    # getattr_static no dispara __getattr__ (Secrets lo redirige a los secretos)
+    try:
+        inspect.getattr_static(obj, attr)
+        return True
+    except AttributeError:
+        return False
+
+
+if not all(_existe(obj, attr) for obj, attr in _INTERNOS):
+    sys.exit(
+        f"loadtest.py depende de internos de streamlit {STREAMLIT_VERIFICADO} que "
+        f"cambiaron en la versión instalada ({st.__version__})."
+    )
+if not st.__version__.startswith(STREAMLIT_VERIFICADO + "."):
+    logging.getLogger(__name__).warning(
+        "loadtest.py fue verificado con streamlit %s; versión instalada %s.",
+        STREAMLIT_VERIFICADO, st.__version__,
+    )
+
+ROOT = Path(__file__).parent
+
+# Clave de session_state con la que el fake atribuye cada llamada a un usuario
+USER_KEY = "_loadtest_usuario"
+
+PROCESOS = ["DESPACHO", "ENTREGA", "RETIRO", "RECEPCION"]
+SERVICIOS = ["CARGA", "MANTENCION", "PRUEBA HIDROSTATICA"]
+
+
+# ------------------------------------------------------------------
+# Datos sintéticos con la forma de las hojas PROCESO y DETALLE
+# ------------------------------------------------------------------
+def generate_sheets(n_procesos: int, n_clientes: int, seed: int) -> dict[str, list[dict]]:
+    rng = random.Random(seed)
+    clientes = [f"CLIENTE {i:03d}" for i in range(1, n_clientes + 1)]
+    ubicaciones = ["LOCAL", "BODEGA"] + clientes
+    series = [100000 + i for i in range(max(n_procesos // 2, 1))]
+    today = datetime.now()
+
+    proceso, detalle = [], []
+    for idproc in range(1, n_procesos + 1):
+        fecha = today - timedelta(days=rng.randint(0, 120), seconds=rng.randint(0, 86399))
+        cliente = rng.choice(clientes)
+        proceso.append({
+            "IDPROC": idproc,
+            "FECHA": fecha.strftime("%d/%m/%Y"),
+            "HORA": fecha.strftime("%H:%M:%S"),
+            "PROCESO": rng.choice(PROCESOS),
+            "CLIENTE": cliente,
+            "UBICACION": rng.choice(ubicaciones),
+        })
+        for serie in rng.sample(series, k=min(rng.randint(1, 4), len(series))):
+            detalle.append({
+                "IDPROC": idproc,
+                "SERIE": serie,
+                "SERVICIO": rng.choice(SERVICIOS),
+            })
+    return {"PROCESO": proceso, "DETALLE": detalle}
+
+
+# ------------------------------------------------------------------
+# Reemplazo local del cliente gspread
+# ------------------------------------------------------------------
+class APIError(Exception):
+    """Equivalente local de `gspread.exceptions.APIError`."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"APIError: [{code}]: {message}")
+        self.code = code
+
+
+class FakeSheetsAPI:
+    """
+    Backend compartido por todos los clientes falsos.
+
+    Cada método público de `FakeClient`/`FakeSpreadsheet`/`FakeWorksheet`
+    cuenta como una llamada a la API: espera `latency` segundos (±50%),
+    puede fallar con probabilidad `error_rate` y respeta una cuota de
+    `quota` llamadas por ventana de `window` segundos para toda la cuenta
+    de servicio, como la cuota real de Sheets.
+    """
+
+    def __init__(self, sheets, latency, error_rate, quota, window, seed):
+        self.sheets = sheets
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota = quota
+        self.window = window
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+        self.calls = defaultdict(int)        # usuario -> llamadas
+        self.rate_limited = defaultdict(int)  # usuario -> respuestas 429
+
+    def call(self, method: str) -> None:
+        user = st.session_state.get(USER_KEY, "desconocido")
+        with self._lock:
+            self.calls[user] += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._window_calls = now, 0
+            self._window_calls += 1
+            over_quota = self.quota > 0 and self._window_calls > self.quota
+            failed = over_quota or self._rng.random() < self.error_rate
+            delay = self.latency * self._rng.uniform(0.5, 1.5)
+        time.sleep(delay)
+        if failed:
+            with self._lock:
+                self.rate_limited[user] += 1
+            raise APIError(429, f"Quota exceeded for quota metric 'Read requests' ({method})")
+
+    def authorize(self, credentials) -> "FakeClient":
+        return FakeClient(self)
+
+    def as_modules(self) -> dict[str, types.ModuleType]:
+        """Paquete `gspread` falso, importable también como `gspread.exceptions`."""
+        exceptions = types.ModuleType("gspread.exceptions")
+        exceptions.APIError = APIError
+        module = types.ModuleType("gspread")
+        module.__path__ = []
+        module.authorize = self.authorize
+        module.exceptions = exceptions
+        return {"gspread": module, "gspread.exceptions": exceptions}
+
+
+class FakeClient:
+    def __init__(self, api: FakeSheetsAPI):
+        self._api = api
+
+    def open(self, title: str) -> "FakeSpreadsheet":
+        self._api.call("open")
+        return FakeSpreadsheet(self._api)
+
+
+class FakeSpreadsheet:
+    def __init__(self, api: FakeSheetsAPI):
+        self._api = api
+
+    def worksheet(self, name: str) -> "FakeWorksheet":
+        self._api.call("worksheet")
+        if name not in self._api.sheets:
+            raise APIError(400, f"Unable to parse range: {name}")
+        return FakeWorksheet(self._api, name)
+
+
+class FakeWorksheet:
+    def __init__(self, api: FakeSheetsAPI, name: str):
+        self._api = api
+        self._name = name
+
+    def get_all_records(self) -> list[dict]:
+        self._api.call("get_all_records")
+        return [dict(row) for row in self._api.sheets[self._name]]
+
+
+# ------------------------------------------------------------------
+# Runtime compartido entre sesiones
+# ------------------------------------------------------------------
+def shared_runtime() -> mock.MagicMock:
+    """
+    AppTest crea y destruye `Runtime._instance` en cada `run()`, lo que no
+    sirve con varias sesiones en paralelo. Construimos uno solo, igual al de
+    AppTest, y lo devolvemos siempre desde `Runtime.instance()`.
+    """
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    bidi = BidiComponentManager()
+    bidi.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = bidi
+    return runtime
+
+
+def shared_bytecode_cache():
+    """
+    Cada `AppTest.run()` crea un `ScriptCache` nuevo y vuelve a compilar la
+    página; `ast.parse` concurrente en CPython 3.11 falla de forma
+    intermitente ("AST constructor recursion depth mismatch"). Compilamos
+    cada página una sola vez, bajo lock, como hace el servidor real.
+    """
+    original = ScriptCache.get_bytecode
+    compiled, lock = {}, threading.Lock()
+
+    def get_bytecode(self, script_path: str):
+        with lock:
+            if script_path not in compiled:
+                compiled[script_path] = original(self, script_path)
+            return compiled[script_path]
+
+    return get_bytecode
+
+
+# ------------------------------------------------------------------
+# Recorrido de un operador por las cinco páginas
+# ------------------------------------------------------------------
+def session(user: str, runtime, timeout: float) -> AppTest:
+    """
+    Una sola sesión por operador, que navega entre páginas con `switch_page`
+    como en el navegador. Reusamos el registro de componentes del runtime
+    compartido para que AppTest no lo reconstruya en cada sesión.
+    """
+    at = AppTest.from_file(str(ROOT / "App.py"), default_timeout=timeout)
+    at._bidi_component_manager = runtime.bidi_component_registry
+    at.session_state["password_correct"] = True
+    at.session_state[USER_KEY] = user
+    return at.run()
+
+
+def user_session(user: str, args, api: FakeSheetsAPI, runtime, sheets, results: list,
+                 failures: list, finished: set, lock) -> None:
+    rng = random.Random(f"{args.seed}-{user}")
+    series = sorted({row["SERIE"] for row in sheets["DETALLE"]})
+    clientes = sorted({row["CLIENTE"] for row in sheets["PROCESO"]})
+    ubicaciones = sorted({row["UBICACION"] for row in sheets["PROCESO"]})
+
+    def date_range(at: AppTest):
+        end = datetime.now().date() - timedelta(days=rng.randint(0, 60))
+        return at.date_input[0].set_value((end - timedelta(days=30), end))
+
+    # (prefijo, página, acciones posteriores a la carga)
+    flows = [
+        ("cilindro", "1_Movimientos_por_Cilindro.py", [
+            ("escribir serie", lambda at: at.text_input[0].input(str(rng.choice(series)))),
+            ("buscar", lambda at: at.button[0].click()),
+        ]),
+        ("cliente", "2_Cilindros_por_Cliente.py", [
+            ("seleccionar", lambda at: at.selectbox[0].select(rng.choice(clientes))),
+            ("buscar", lambda at: at.button[0].click()),
+        ]),
+        ("rotacion", "3_Rotacion.py", []),
+        ("ubicacion", "4_Cilindros_por_Ubicacion.py", [
+            ("seleccionar", lambda at: at.selectbox[0].select(rng.choice(ubicaciones))),
+        ]),
+        ("fecha", "5_Movimientos_por_fecha.py", [
+            ("rango", date_range),
+            ("buscar", lambda at: at.button[0].click()),
+        ]),
+    ]
+
+    try:
+        at = session(user, runtime, args.timeout)
+    except Exception as e:
+        with lock:
+            failures.append((user, "ingreso", repr(e)))
+        return
+
+    for _ in range(args.iteraciones):
+        for i, (prefix, script, actions) in enumerate(flows):
+            load = ("carga", lambda at, script=script: at.switch_page(f"pages/{script}"))
+            for j, (label, action) in enumerate([load] + actions):
+                name = f"{prefix}: {label}"
+                calls_before = api.calls[user]
+                start = time.perf_counter()
+                try:
+                    at = action(at).run()
+                except Exception as e:
+                    # El operador queda atascado: muestra fallida y fin del recorrido
+                    with lock:
+                        results.append(((i, j), name, time.perf_counter() - start,
+                                        api.calls[user] - calls_before, 1))
+                        failures.append((user, name, repr(e)))
+                    return
+                elapsed = time.perf_counter() - start
+                # Todas las páginas muestran st.title; si no aparece, la
+                # ejecución no llegó a la página (p. ej. error de compilación)
+                errors = len(at.error) + len(at.exception) + (0 if at.title else 1)
+                with lock:
+                    results.append(((i, j), name, elapsed,
+                                    api.calls[user] - calls_before, errors))
+                if args.pausa:
+                    time.sleep(rng.uniform(0, args.pausa))
+                # Si la página falló, el operador no puede seguir en ella
+                if errors:
+                    break
+
+    with lock:
+        finished.add(user)
+
+
+# ------------------------------------------------------------------
+# Reporte
+# ------------------------------------------------------------------
+def percentile(values: list[float], pct: float) -> float:
+    # Rango más cercano: el menor valor con al menos pct% de la muestra bajo él
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def report(results: list, failures: list, finished: set, api: FakeSheetsAPI, args,
+           elapsed: float) -> pd.DataFrame:
+    by_action = defaultdict(list)
+    for _, label, latency, calls, errors in sorted(results, key=lambda r: r[0]):
+        by_action[label].append((latency, calls, errors))
+    if results:
+        by_action["TOTAL"] = [(lat, calls, err) for _, _, lat, calls, err in results]
+
+    rows = []
+    for label, samples in by_action.items():
+        latencies = [s[0] for s in samples]
+        rows.append({
+            "ACCION": label,
+            "N": len(samples),
+            "P50_S": round(percentile(latencies, 50), 3),
+            "P95_S": round(percentile(latencies, 95), 3),
+            "LLAMADAS_API_PROM": round(statistics.mean(s[1] for s in samples), 2),
+            "ERRORES": sum(1 for s in samples if s[2]),
+        })
+    df = pd.DataFrame(rows, columns=["ACCION", "N", "P50_S", "P95_S", "LLAMADAS_API_PROM", "ERRORES"])
+
+    print(f"\nUsuarios: {args.usuarios}  Iteraciones: {args.iteraciones}  "
+          f"Duración: {elapsed:.1f} s")
+    print(df.to_string(index=False))
+    print(f"\nLlamadas API totales: {sum(api.calls.values())}  "
+          f"Respuestas 429: {sum(api.rate_limited.values())}")
+    print(f"RSS máximo del proceso: {peak_rss_mb():.1f} MB")
+    if api.rate_limited:
+        print("ATENCIÓN: hubo respuestas 429; latencias y RSS reflejan en parte páginas "
+              "de error y no sirven para estimar operadores por contenedor.")
+
+    pending = args.usuarios - len(finished)
+    if pending or failures:
+        print(f"\n{pending} de {args.usuarios} usuarios no terminaron su recorrido:")
+        for user, action, error in failures:
+            print(f"  {user} en '{action}': {error}")
+    return df
+
+
+# ------------------------------------------------------------------
+# Punto de entrada
+# ------------------------------------------------------------------
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"debe ser un entero positivo: {value}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de FASTRACK con Sheets simulado.")
+    parser.add_argument("--usuarios", type=positive_int, default=5, help="Operadores concurrentes")
+    parser.add_argument("--iteraciones", type=positive_int, default=1, help="Recorridos completos por operador")
+    parser.add_argument("--latencia", type=float, default=0.3, help="Latencia media por llamada a Sheets (s)")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de 429 aleatorio por llamada")
+    parser.add_argument("--cuota", type=int, default=0,
+                        help="Llamadas permitidas por ventana (0 = sin límite; la cuota real de Sheets es 60/min)")
+    parser.add_argument("--ventana", type=float, default=60.0, help="Duración de la ventana de cuota (s)")
+    parser.add_argument("--procesos", type=positive_int, default=2000, help="Filas sintéticas en PROCESO")
+    parser.add_argument("--clientes", type=positive_int, default=30, help="Clientes distintos en los datos")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Pausa máxima entre acciones (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por ejecución de página (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", type=Path, help="Guardar el resumen en CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sys.path.insert(0, str(ROOT))  # para `from auth import check_password`
+    # Los hilos de usuario no tienen ScriptRunContext; el aviso es esperado
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.msg
+    )
+
+    sheets = generate_sheets(args.procesos, args.clientes, args.seed)
+    api = FakeSheetsAPI(sheets, args.latencia, args.tasa_error, args.cuota, args.ventana, args.seed)
+    runtime = shared_runtime()
+    secrets = Secrets()
+    secrets._secrets = {"password": "loadtest", "gcp_service_account": {}}
+
+    results, failures, finished, lock = [], [], set(), threading.Lock()
+    with mock.patch.dict(sys.modules, api.as_modules()), \
+         mock.patch.object(service_account.Credentials, "from_service_account_info",
+                           side_effect=lambda info, scopes=None: info), \
+         mock.patch.object(st, "secrets", secrets), \
+         mock.patch.object(Runtime, "instance", return_value=runtime), \
+         mock.patch.object(Runtime, "exists", return_value=True), \
+         mock.patch.object(ScriptCache, "get_bytecode", shared_bytecode_cache()), \
+         patch_config_options({"global.appTest": True}), \
+         mock.patch.object(app_test, "patch_config_options",
+                           side_effect=lambda overrides: nullcontext()):
+        threads = [
+            threading.Thread(
+                target=user_session,
+                args=(f"usuario-{i}", args, api, runtime, sheets, results, failures, finished, lock),
+                name=f"usuario-{i}",
+            )
+            for i in range(1, args.usuarios + 1)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+    df = report(results, failures, finished, api, args, elapsed)
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+    # Falla si algún operador quedó atascado o alguna acción mostró errores
+    stuck = len(finished) < args.usuarios
+    return 1 if stuck or any(r[4] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())